@@ -1,4 +1,4 @@
-import os
+import sys
 import streamlit as st
 from src.data_load import show_data_load
 from src.correlations import show_correlations
@@ -68,10 +68,21 @@ with tabs[5]:
 with tabs[6]:
     st.subheader("🧾 Raw Data Preview")
     if df is not None:
-        st.dataframe(df)
+        # Only send one page of rows to the browser at a time
+        page_size = 1000
+        n_pages = max(1, -(-len(df) // page_size))
+        page = st.number_input(f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, value=1, step=1, key="raw_data_page")
+        start = (page - 1) * page_size
+        st.dataframe(df.iloc[start:start + page_size])
+        st.caption(f"Rows {start + 1:,}–{min(start + page_size, len(df)):,} of {len(df):,}")
     else:
         st.warning("⚠️ Load data first from the Data Load tab.")
 
 # ---------------------- Main Entry ----------------------
-if __name__ == "__main__":
-    os.system("streamlit run app.py")
+# `streamlit run` also executes this file as __main__, so only launch when started with plain `python app.py`,
+# and do it in-process instead of spawning a second interpreter through the shell.
+if __name__ == "__main__" and not st.runtime.exists():
+    from streamlit.web.cli import main as st_main
+
+    sys.argv = ["streamlit", "run", __file__]
+    sys.exit(st_main())
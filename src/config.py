@@ -15,3 +15,7 @@ PLANT_SITE_MAP: dict[str, str] = {
 
 SCHEMA_NAME = "CMP_SIMPLY"
 TABLE_NAME = "MASTER_ML"
+QUERY_TAG = "simply_eda_app"  # tags the app's queries in Snowflake query history
+
+# MASTER_ML columns that identify a batch; the pivot turns each feature_name into its own column
+BATCH_KEY_COLUMNS = ["batch_id", "material_id", "plant_id", "stage", "manufacture_date", "product_name"]
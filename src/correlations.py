@@ -1,5 +1,116 @@
 import streamlit as st
+import numpy as np
+import pandas as pd
 import plotly.graph_objects as go
+from src.utils import cached_on_fingerprint, df_fingerprint, numeric_columns, numeric_matrix
+
+# More markers than this look the same in a scatter plot but make the browser lag
+SCATTER_MAX_POINTS = 10_000
+
+
+def _centered(X: np.ndarray):
+    """
+    Center the columns of X in place on their non-NaN mean and zero the NaNs, so the raw-moment
+    sums in the correlation kernels don't lose precision. Returns X and its 0/1 validity mask.
+    """
+    valid = ~np.isnan(X)
+    m = valid.astype(X.dtype)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        X[~valid] = 0.0
+        X -= X.sum(axis=0) / m.sum(axis=0)
+        X[~valid] = 0.0
+    return X, m
+
+
+@cached_on_fingerprint(max_entries=8)
+def _target_correlations(df_hash, num_mat: np.ndarray, target_idx: int) -> np.ndarray:
+    """
+    Pearson correlation of every numeric column with the target column using a few
+    matrix-vector products. Like `corrwith`, each column only uses the rows where both
+    it and the target are present.
+    """
+    X, m = _centered(num_mat.copy())
+    y, my = X[:, target_idx].copy(), m[:, target_idx].copy()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        n = my @ m              # rows where both the column and the target are present
+        sx = my @ X             # sum of x over those rows
+        sy = y @ m              # sum of y over those rows
+        sxx = my @ (X * X)
+        syy = (y * y) @ m
+        cov = y @ X - sx * sy / n
+        corr = np.clip(cov / np.sqrt((sxx - sx * sx / n) * (syy - sy * sy / n)), -1.0, 1.0)
+
+    return corr
+
+
+@cached_on_fingerprint(max_entries=32)
+def _correlation_matrix(df_hash, num_mat: np.ndarray, col_ids: tuple) -> np.ndarray:
+    """
+    Pearson correlation between the selected numeric columns using a handful of matrix
+    products instead of pandas' column-pair loop. Like `DataFrame.corr`, every pair only
+    uses the rows where both columns are present.
+    """
+    X, m = _centered(num_mat[:, list(col_ids)])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if m.all():
+            # No missing values: every pair uses all rows, so one GEMM of the centered block is enough
+            cov = X.T @ X
+            var = np.diag(cov)
+            return np.clip(cov / np.sqrt(np.outer(var, var)), -1.0, 1.0)
+
+        n = m.T @ m             # rows where both i and j are present
+        s = X.T @ m             # sum of x_i over those rows
+        ss = (X * X).T @ m      # sum of x_i^2 over those rows
+        cov = X.T @ X - s * s.T / n
+        var = ss - s * s / n
+        corr = np.clip(cov / np.sqrt(var * var.T), -1.0, 1.0)
+
+    return corr
+
+
+@cached_on_fingerprint(max_entries=32)
+def _scatter_figure(df_hash, num_mat: np.ndarray, feat_idx: int, target_idx: int, feat: str, target_col: str) -> go.Figure:
+    """
+    WebGL scatter of a feature against the target, on a random sample for large frames.
+    """
+    x, y = num_mat[:, feat_idx], num_mat[:, target_idx]
+    if len(x) > SCATTER_MAX_POINTS:
+        rows = np.random.default_rng(0).choice(len(x), SCATTER_MAX_POINTS, replace=False)
+        x, y = x[rows], y[rows]
+    fig = go.Figure(go.Scattergl(x=x, y=y, mode="markers", marker=dict(size=4, opacity=0.5)))
+    fig.update_layout(
+        title=f"{feat} vs {target_col}",
+        xaxis_title=feat,
+        yaxis_title=target_col
+    )
+    return fig
+
+
+# Above this many features the per-cell correlation labels become unreadable
+HEATMAP_MAX_ANNOTATED = 20
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _heatmap_figure(values: bytes, labels: tuple) -> go.Figure:
+    """
+    Correlation heatmap figure, cached per (matrix content, labels) so reruns with the
+    same selection skip rebuilding and validating the Plotly figure. Values are rounded
+    for display by Plotly in the browser.
+    """
+    z = np.frombuffer(values, dtype=np.float32).reshape(len(labels), len(labels))
+    fig = go.Figure(
+        go.Heatmap(
+            z=z, x=list(labels), y=list(labels),
+            colorscale="RdBu", zmin=-1, zmax=1, colorbar_title="Correlation",
+            texttemplate="%{z:.2f}" if len(labels) <= HEATMAP_MAX_ANNOTATED else None,
+            hovertemplate="%{y} / %{x}: %{z:.2f}<extra></extra>",
+        )
+    )
+    fig.update_layout(template="plotly_white")
+    return fig
+
 
 def show_correlations(df):
     st.subheader("🔗 Correlations & Visualizations")
@@ -10,7 +121,7 @@ def show_correlations(df):
         return
 
     # Compute numeric cols dynamically
-    numeric_cols = df.select_dtypes(include="number").columns.tolist()
+    numeric_cols = numeric_columns(df)
     if not numeric_cols:
         st.warning("No numeric columns detected in the dataset.")
         return
@@ -30,8 +141,11 @@ def show_correlations(df):
 
     # --- C) Feature-to-Target Correlations ---
     st.markdown("### 🔎 Feature-to-Target Correlations")
+    df_hash = df_fingerprint(df)
+    num_mat, col_idx = numeric_matrix(df)
+    target_corrs = _target_correlations(df_hash, num_mat, col_idx[target_col])
+    corrs = pd.Series(target_corrs, index=numeric_cols).drop(target_col)
     try:
-        corrs = df[numeric_cols].corrwith(df[target_col]).drop(target_col, errors="ignore")
         top = corrs.sort_values(key=abs, ascending=False)
         if top.empty:
             st.info("No features meet the selected correlation threshold.")
@@ -42,67 +156,65 @@ def show_correlations(df):
 
     # --- D) Scatter Plot ---
     st.markdown("---")
-    st.markdown("### 📈 Scatter Plot: Feature vs Target")
     feat_options = [c for c in numeric_cols if c != target_col]
-    if not feat_options:
-        st.info("Not enough numeric features (besides the target) to plot.")
-    else:
-        feat = st.selectbox("Select feature", feat_options, key="scatter_feat_sel")
-        fig_scatter = go.Figure(go.Scatter(x=df[feat], y=df[target_col], mode="markers"))
-        fig_scatter.update_layout(
-            title=f"{feat} vs {target_col}",
-            xaxis_title=feat,
-            yaxis_title=target_col
-        )
-        st.plotly_chart(fig_scatter, use_container_width=True)
+    with st.expander("📈 Scatter Plot: Feature vs Target", expanded=False):
+        if not feat_options:
+            st.info("Not enough numeric features (besides the target) to plot.")
+        else:
+            # form: the plot only refreshes on submit, not on every widget change
+            with st.form("scatter_form", clear_on_submit=False):
+                feat = st.selectbox("Select feature", feat_options, key="scatter_feat_sel")
+                st.form_submit_button("Plot")
+            fig_scatter = _scatter_figure(df_hash, num_mat, col_idx[feat], col_idx[target_col], feat, target_col)
+            st.plotly_chart(fig_scatter, use_container_width=True)
+            if len(df) > SCATTER_MAX_POINTS:
+                st.caption(f"Showing a random sample of {SCATTER_MAX_POINTS:,} of {len(df):,} rows.")
 
     # --- E) Selected Corr Table ---
     st.markdown("---")
-    st.markdown("### 🧮 Selected Features vs Target Correlation Table")
-
-    # Auto-pick top 3 correlated features
-    if feat_options:
-        corrs_sorted = df[feat_options].corrwith(df[target_col]).abs().sort_values(ascending=False)
-        default_corr_features = corrs_sorted.head(min(3, len(corrs_sorted))).index.tolist()
-    else:
-        default_corr_features = []
-
-    sel = st.multiselect(
-        "Select features",
-        feat_options,
-        default=default_corr_features,
-        key="selected_corr_features",
-    )
-    if sel:
-        try:
-            sc = df[sel].corrwith(df[target_col]).sort_values(key=abs, ascending=False)
-            st.dataframe(sc.to_frame(f"Correlation with {target_col}"))
-        except Exception as e:
-            st.error(f"Error computing selected correlations: {e}")
-    else:
-        st.info("Pick one or more features to see correlations with the target.")
+    with st.expander("🧮 Selected Features vs Target Correlation Table", expanded=False):
+        # Auto-pick top 3 correlated features
+        if feat_options:
+            corrs_sorted = corrs.abs().sort_values(ascending=False)
+            default_corr_features = corrs_sorted.head(min(3, len(corrs_sorted))).index.tolist()
+        else:
+            default_corr_features = []
+
+        with st.form("selected_corr_form", clear_on_submit=False):
+            sel = st.multiselect(
+                "Select features",
+                feat_options,
+                default=default_corr_features,
+                key="selected_corr_features",
+            )
+            st.form_submit_button("Show correlations")
+        if sel:
+            try:
+                sc = corrs.reindex(sel).sort_values(key=abs, ascending=False)
+                st.dataframe(sc.to_frame(f"Correlation with {target_col}"))
+            except Exception as e:
+                st.error(f"Error computing selected correlations: {e}")
+        else:
+            st.info("Pick one or more features to see correlations with the target.")
 
     # --- F) Heatmap ---
     st.markdown("---")
-    st.markdown("### 🌡️ Correlation Heatmap")
-    sel_heat = st.multiselect(
-        "Select features for heatmap",
-        numeric_cols,
-        default=numeric_cols[: min(5, len(numeric_cols))],
-        key="heatmap_features",
-    )
-    if len(sel_heat) >= 2:
-        try:
-            mat = df[sel_heat].corr().round(2)
-            fig_heat = go.Figure(
-                go.Heatmap(
-                    z=mat.values, x=sel_heat, y=sel_heat,
-                    colorscale="RdBu", zmin=-1, zmax=1, colorbar_title="Correlation"
-                )
+    with st.expander("🌡️ Correlation Heatmap", expanded=False):
+        with st.form("heatmap_form", clear_on_submit=False):
+            sel_heat = st.multiselect(
+                "Select features for heatmap",
+                numeric_cols,
+                default=numeric_cols[: min(5, len(numeric_cols))],
+                key="heatmap_features",
             )
-            fig_heat.update_layout(template="plotly_white")
-            st.plotly_chart(fig_heat, use_container_width=True)
-        except Exception as e:
-            st.error(f"Error creating heatmap: {e}")
-    else:
-        st.info("Select at least two features to render a heatmap.")
+            st.form_submit_button("Draw heatmap")
+        if len(sel_heat) >= 2:
+            try:
+                # Only the selected block is computed (and cached per selection)
+                corr_block = _correlation_matrix(df_hash, num_mat, tuple(col_idx[c] for c in sel_heat))
+                fig_heat = _heatmap_figure(corr_block.astype(np.float32, copy=False).tobytes(), tuple(sel_heat))
+                st.plotly_chart(fig_heat, use_container_width=True)
+            except Exception as e:
+                st.error(f"Error creating heatmap: {e}")
+        else:
+            st.info("Select at least two features to render a heatmap.")
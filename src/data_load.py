@@ -2,23 +2,30 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from typing import Optional
-import snowflake.connector
+import contextlib
 import os
+import io
 import json
-import multiprocessing
 import re
+import tempfile
+import threading
 import traceback
 import warnings
 from dataclasses import dataclass
-from multiprocessing.pool import ThreadPool
+from functools import lru_cache
 from pathlib import Path
-from tempfile import TemporaryDirectory
 from typing import TYPE_CHECKING, Any, Optional, Union
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import serialization
 import glob
+import time
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
-from src.config import PLANT_SITE_MAP, SCHEMA_NAME, TABLE_NAME
+from src.config import BATCH_KEY_COLUMNS, PLANT_SITE_MAP, SCHEMA_NAME, TABLE_NAME, QUERY_TAG
+
+# snowflake-connector and cryptography are slow to import and only needed in Snowflake mode,
+# so they are imported inside the functions that talk to Snowflake
+if TYPE_CHECKING:
+    import snowflake.connector
 
 default_path = "/home/oneai/simply-eda-app/data/Frankfurt/08/Frankfurt_08_data.csv"  
 
@@ -38,6 +45,11 @@ def show_data_load(default_path: str=default_path) -> pd.DataFrame:
 
     # Default to Manual Upload instead of Snowflake
     load_source = st.radio("Select Data Source:", ["Snowflake", "Manual Upload"], index=1, horizontal=True)
+    reduce_precision = st.checkbox(
+        "Reduce precision (float32)", value=True,
+        help="Store float columns as float32 and integers in the smallest type that fits: "
+             "about half the memory and faster analysis. Untick for full float64 precision.",
+    )
 
     df = None
 
@@ -46,6 +58,11 @@ def show_data_load(default_path: str=default_path) -> pd.DataFrame:
         schema_name = SCHEMA_NAME
         table_name = TABLE_NAME
 
+        # Snowflake results are cached for an hour; let the user drop them on demand
+        if st.button("♻️ Force refresh", help="Re-read the plant/stage list and table data from Snowflake"):
+            get_plant_stage_mapping.clear()
+            read_source_table.clear()
+
         # Dict: {plant_id: [stage1, stage2, ...]}
         plant_stage_map = get_plant_stage_mapping(schema_name, table_name)
 
@@ -61,30 +78,35 @@ def show_data_load(default_path: str=default_path) -> pd.DataFrame:
         if plant_id and stage_name:
             folder_path = Path(f"data/{selected_site}/{stage_name}")
             folder_path.mkdir(parents=True, exist_ok=True)  # auto-create if not exists
-            file_path = folder_path / f"{selected_site}_{stage_name}_data.csv"
+            file_path = folder_path / f"{selected_site}_{stage_name}_data.parquet"
+            legacy_csv = file_path.with_suffix(".csv")  # extracts saved before the switch to Parquet
         else:
-            file_path = None
+            file_path = legacy_csv = None
 
         col1, col2 = st.columns(2)
 
         if col1.button("📂 Load Existing from File"):
             if not (plant_id and stage_name):
                 st.error("❌ Please enter both Plant ID and Stage to continue.")
-            elif file_path and file_path.exists():
+            elif file_path.exists() or legacy_csv.exists():
                 try:
-                    df = pd.read_csv(file_path)
-                    st.session_state["df"] = df
-                    st.success(f"✅ Loaded data from {file_path}")
+                    if file_path.exists():
+                        source = (str(file_path), file_path.stat().st_mtime, reduce_precision)
+                        _store_df(_load_parquet(*source), source)
+                    else:
+                        # _load_csv keeps its own <name>.csv.parquet sidecar, so file_path is never written here
+                        source = (str(legacy_csv), legacy_csv.stat().st_mtime, reduce_precision)
+                        _store_df(_load_csv(*source), source)
+                    st.success(f"✅ Loaded data from {source[0]}")
                 except Exception as e:
                     st.error(f"❌ Error reading existing file: {e}")
                     st.code(traceback.format_exc(), language="python")
             else:
                 st.warning("⚠️ File not found locally. Fetching from Snowflake instead...")
                 try:
-                    df_raw = read_source_table(schema_name, table_name, plant_id, stage_name)
-                    df = pivot_master_data(df_raw)
-                    df.to_csv(file_path, index=False)
-                    st.session_state["df"] = df
+                    df = _fetch_from_snowflake(schema_name, table_name, plant_id, stage_name)
+                    df.to_parquet(file_path, compression="snappy", index=False)
+                    _store_df(_reduce_precision(df, reduce_precision))
                     st.success(f"✅ Loaded from Snowflake & saved to {file_path}")
                 except Exception as e:
                     st.error(f"❌ Error fetching from Snowflake: {e}")
@@ -94,16 +116,16 @@ def show_data_load(default_path: str=default_path) -> pd.DataFrame:
             if not (plant_id and stage_name):
                 st.error("❌ Please enter both Plant ID and Stage to continue.")
             else:
-                with st.spinner("Fetching NEW data from Snowflake..."):
-                    try:
-                        df_raw = read_source_table(schema_name, table_name, plant_id, stage_name)
-                        df = pivot_master_data(df_raw)
-                        df.to_csv(file_path, index=False)
-                        st.session_state["df"] = df
-                        st.success(f"✅ Loaded {df.shape[0]:,} rows & {df.shape[1]:,} cols from Snowflake and saved to {file_path}")
-                    except Exception as e:
-                        st.error(f"❌ Error loading from Snowflake: {e}")
-                        st.code(traceback.format_exc(), language="python")
+                try:
+                    # Bypass the cached result so this really hits Snowflake again
+                    read_source_table.clear()
+                    df = _fetch_from_snowflake(schema_name, table_name, plant_id, stage_name)
+                    df.to_parquet(file_path, compression="snappy", index=False)
+                    _store_df(_reduce_precision(df, reduce_precision))
+                    st.success(f"✅ Loaded {df.shape[0]:,} rows & {df.shape[1]:,} cols from Snowflake and saved to {file_path}")
+                except Exception as e:
+                    st.error(f"❌ Error loading from Snowflake: {e}")
+                    st.code(traceback.format_exc(), language="python")
 
     else:
         # ---------------- Manual Upload Option (Default) ----------------
@@ -113,8 +135,9 @@ def show_data_load(default_path: str=default_path) -> pd.DataFrame:
             uploaded_file = st.file_uploader("Upload a CSV file", type=["csv"])
             if uploaded_file:
                 try:
-                    df = pd.read_csv(uploaded_file)
-                    st.session_state["df"] = df
+                    source = ("upload", uploaded_file.file_id, reduce_precision)
+                    if st.session_state.get("df_source") != source:
+                        _store_df(_load_uploaded_csv(uploaded_file.getvalue(), reduce_precision), source)
                     st.success("✅ File uploaded successfully.")
                 except Exception as e:
                     st.error(f"❌ Error reading file: {e}")
@@ -124,8 +147,9 @@ def show_data_load(default_path: str=default_path) -> pd.DataFrame:
             file_path = st.text_input("Enter full file path:", value=default_path)
             if os.path.exists(file_path):
                 try:
-                    df = pd.read_csv(file_path)
-                    st.session_state["df"] = df
+                    source = (file_path, os.path.getmtime(file_path), reduce_precision)
+                    if st.session_state.get("df_source") != source:
+                        _store_df(_load_csv(*source), source)
                     st.success(f"✅ Loaded file from: {file_path}")
                 except Exception as e:
                     st.error(f"❌ Error reading file: {e}")
@@ -136,7 +160,7 @@ def show_data_load(default_path: str=default_path) -> pd.DataFrame:
     # ---------------- Preview ----------------
     if "df" in st.session_state:
         st.write("### Preview of Data")
-        st.dataframe(st.session_state["df"].head(50), use_container_width=True)
+        st.dataframe(st.session_state["df"].head(50), use_container_width=True, height=400)
     else:
         st.info("ℹ️ Load data to use it in other tabs.")
 
@@ -144,6 +168,181 @@ def show_data_load(default_path: str=default_path) -> pd.DataFrame:
     return st.session_state.get("df")
 
 
+def _fetch_from_snowflake(schema_name: str, table_name: str, plant_id: str, stage_name: str) -> pd.DataFrame:
+    """
+    Fetches and pivots the MASTER_ML data for one plant/stage off the script thread,
+    showing a live status with the elapsed time meanwhile. The pivot keeps full (float64)
+    precision so the saved extract can be reloaded either way; callers apply the
+    "Reduce precision" option to the in-memory frame.
+    @return: pivoted pd.DataFrame
+    """
+    with st.status("Fetching data from Snowflake...") as status:
+        df_raw = _run_in_background(
+            status, "Fetching data from Snowflake...", read_source_table, schema_name, table_name, plant_id, stage_name
+        )
+        df = _run_in_background(  # reduce_precision=False: the extract is saved at full precision
+            status, f"Pivoting {len(df_raw):,} rows...", pivot_master_data, df_raw, False
+        )
+        status.update(label=f"Fetched {len(df_raw):,} rows from Snowflake")
+    return df
+
+
+def _run_in_background(status, label: str, func, *args):
+    """
+    Runs func(*args) in a worker thread and refreshes the status label until it is done.
+    Stopping the app run therefore returns right away instead of waiting for Snowflake;
+    an abandoned fetch still finishes and fills the read_source_table cache.
+    @param status: st.status container to update
+    @param label: str. Status text, the elapsed seconds are appended to it
+    @return: whatever func returns
+    """
+    # The worker gets the script's context so cached functions behave as on the main thread
+    executor = ThreadPoolExecutor(max_workers=1, initializer=add_script_run_ctx, initargs=(None, get_script_run_ctx()))
+    try:
+        future = executor.submit(func, *args)
+        start = time.monotonic()
+        while not future.done():
+            status.update(label=f"{label} ({time.monotonic() - start:.0f}s)")
+            time.sleep(0.5)
+        return future.result()
+    finally:
+        executor.shutdown(wait=False)
+
+
+def _store_df(df: pd.DataFrame, source: Optional[tuple] = None) -> None:
+    """
+    Keeps the loaded DataFrame in the session. Reruns with an unchanged `source` reuse it
+    as is, so the other tabs keep seeing the same object instead of a fresh copy.
+    @param df: pd.DataFrame
+    @param source: Optional[tuple]. Identifies the file/upload df was read from, None for Snowflake
+    """
+    st.session_state["df"] = df
+    st.session_state["df_source"] = source
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _load_csv(path: str, mtime: float, reduce_precision: bool = True) -> pd.DataFrame:
+    """
+    Reads a CSV file from disk, cached across Streamlit reruns.
+    @param path: str. Path of the CSV file
+    @param mtime: float. Last modification time of the file, only used as cache key so edits are picked up
+    @param reduce_precision: bool. Downcast the numeric columns, see `_reduce_precision`
+    @return: pd.DataFrame
+    """
+    # Prefer a Parquet sidecar written by a previous load, as long as it is not older than the CSV.
+    # It is named after the whole CSV file name (data.csv -> data.csv.parquet), so it never
+    # replaces a Parquet file of the user's
+    sidecar = Path(f"{path}.parquet")
+    if sidecar.exists() and sidecar.stat().st_mtime >= mtime:
+        return _reduce_precision(_categorize_keys(pd.read_parquet(sidecar)), reduce_precision)
+
+    df = _read_csv(path)
+    _write_sidecar(df, sidecar)
+    return _reduce_precision(df, reduce_precision)
+
+
+def _write_sidecar(df: pd.DataFrame, sidecar: Path) -> None:
+    """
+    Saves the Parquet sidecar of a CSV. The file is written under a temporary name and then
+    renamed, so readers never see a partial sidecar; on failure (read-only folder, a column
+    Arrow can't store) only that temporary file is removed and the load goes on without one.
+    @param df: pd.DataFrame, as parsed from the CSV
+    @param sidecar: Path. Where the sidecar goes
+    """
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=sidecar.parent, prefix=f".{sidecar.name}.", suffix=".tmp")
+        os.close(fd)
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, sidecar)
+    except Exception:
+        if tmp_path is not None:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _load_parquet(path: str, mtime: float, reduce_precision: bool = True) -> pd.DataFrame:
+    """
+    Reads a Parquet extract from disk, cached across Streamlit reruns.
+    @param path: str. Path of the Parquet file
+    @param mtime: float. Last modification time of the file, only used as cache key so new extracts are picked up
+    @param reduce_precision: bool. Downcast the numeric columns, see `_reduce_precision`
+    @return: pd.DataFrame
+    """
+    return _reduce_precision(_categorize_keys(pd.read_parquet(path)), reduce_precision)
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _load_uploaded_csv(data: bytes, reduce_precision: bool = True) -> pd.DataFrame:
+    """
+    Reads an uploaded CSV file, cached across Streamlit reruns on the file content.
+    @param data: bytes. Raw content of the uploaded file
+    @param reduce_precision: bool. Downcast the numeric columns, see `_reduce_precision`
+    @return: pd.DataFrame
+    """
+    return _reduce_precision(_read_csv(io.BytesIO(data)), reduce_precision)
+
+
+def _read_csv(source: Union[str, Path, io.BytesIO]) -> pd.DataFrame:
+    """
+    Parses a CSV with the multithreaded pyarrow engine, falling back to the default C engine
+    for files pyarrow can't handle.
+    @param source: path or buffer of the CSV
+    @return: pd.DataFrame
+    """
+    try:
+        df = pd.read_csv(source, engine="pyarrow")
+    except Exception:
+        if isinstance(source, io.BytesIO):
+            source.seek(0)
+        df = pd.read_csv(source)
+    return _categorize_keys(df)
+
+
+def _categorize_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Stores the batch key columns (BATCH_KEY_COLUMNS) that are present as categoricals, so a
+    frame read from a file has the same key dtypes as one fetched from Snowflake (see
+    `read_source_table`) and the keys stay out of the numeric analyses. Done after reading rather than through read_csv(dtype=...), which the pyarrow engine
+    rejects for absent columns; Parquet also gives integer categories back as plain ints.
+    @param df: pd.DataFrame, modified in place
+    @return: the same pd.DataFrame
+    """
+    categorical = [col for col in BATCH_KEY_COLUMNS if col in df.columns]
+    if categorical:
+        df[categorical] = df[categorical].astype("category")
+    return df
+
+
+def _reduce_precision(df: pd.DataFrame, enabled: bool) -> pd.DataFrame:
+    """
+    Applies the "Reduce precision" load option: float32 floats (see `_downcast_floats`) and
+    the smallest signed type that holds the values of each integer column (lossless).
+    @param df: pd.DataFrame, modified in place
+    @param enabled: bool. When False the frame is returned untouched
+    @return: the same pd.DataFrame
+    """
+    if not enabled:
+        return df
+    _downcast_floats(df)
+    for col in df.select_dtypes(include="integer").columns:
+        df[col] = pd.to_numeric(df[col], downcast="integer")
+    return df
+
+
+def _downcast_floats(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Stores float columns as float32 (plenty for sensor data), which halves memory and
+    bandwidth for the summary, correlation and lift computations.
+    @param df: pd.DataFrame, modified in place
+    @return: the same pd.DataFrame
+    """
+    float_cols = df.select_dtypes(include="float").columns
+    if len(float_cols):
+        df[float_cols] = df[float_cols].astype(np.float32)
+    return df
+
 
 @dataclass
 class SnowflakeAuthentication:
@@ -157,9 +356,25 @@ class SnowflakeAuthentication:
 
 
 
+@lru_cache(maxsize=1)
+def _load_private_key(key_path: str, passphrase: bytes):
+    """
+    Reads and decrypts the PEM private key used for Snowflake key-pair authentication,
+    once per key file and passphrase rather than on every (re)connection.
+    @param key_path: str. Path of the PEM private key file
+    @param passphrase: bytes. Passphrase protecting the key
+    @return: the parsed private key object
+    """
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import serialization
+
+    with Path(key_path).open("rb") as key_file:
+        return serialization.load_pem_private_key(key_file.read(), password=passphrase, backend=default_backend())
+
+
 def _get_snowflake_connection(
     schema: Optional[str] = None, custom_conf: Optional[dict] = None
-) -> snowflake.connector.SnowflakeConnection:
+) -> "snowflake.connector.SnowflakeConnection":
     """
     This is a helper function to connect to SimplY Snowflake database
     based on the credentials specified in the config file and oneAI's secrets
@@ -168,6 +383,8 @@ def _get_snowflake_connection(
     @param custom_conf: Dict with SnowflakeAuthentication attributes to overwrite
     @return: SnowflakeConnection
     """
+    import snowflake.connector
+
     # Load snowflake configuration yml file
     config  = {"snowflake_authentication":{"dev":{
     "account": "sanofi-emea_ia",
@@ -186,33 +403,20 @@ def _get_snowflake_connection(
     environment = os.getenv("ENVIRONMENT")
 
     # Determine the db connection based on the environment
+    passphrase = os.getenv("SNOWFLAKE_PRIVATE_KEY_PASSPHRASE", "").encode()
     if environment == "PRODUCTION":
         # Run on SIMPLY_PROD
-        passphrase = os.getenv("SNOWFLAKE_PRIVATE_KEY_PASSPHRASE", "").encode()
-        file_path = Path(os.getenv("SNOWFLAKE_PRIVATE_KEY_PATH", ""))
-        with file_path.open("rb") as key_file:
-            p_key = serialization.load_pem_private_key(
-                key_file.read(), password=passphrase, backend=default_backend()
-            )
+        key_path = os.getenv("SNOWFLAKE_PRIVATE_KEY_PATH", "")
         config_for_env = config["snowflake_authentication"]["prod"]
     elif environment == "STAGING":
         # Run on SIMPLY_UAT
-        passphrase = os.getenv("SNOWFLAKE_PRIVATE_KEY_PASSPHRASE", "").encode()
-        file_path = Path(os.getenv("SNOWFLAKE_PRIVATE_KEY_PATH", ""))
-        with file_path.open("rb") as key_file:
-            p_key = serialization.load_pem_private_key(
-                key_file.read(), password=passphrase, backend=default_backend()
-            )
+        key_path = os.getenv("SNOWFLAKE_PRIVATE_KEY_PATH", "")
         config_for_env = config["snowflake_authentication"]["uat"]
     else:
         # Run on SIMPLY_DEV (default fallback option)
-        passphrase = os.getenv("SNOWFLAKE_PRIVATE_KEY_PASSPHRASE", "").encode()
-        file_path = Path("/home/oneai/oneai-dda-simply-prj0060876_ml/keys/dev_transform_pk.p8")
-        with file_path.open("rb") as key_file:
-            p_key = serialization.load_pem_private_key(
-                key_file.read(), password=passphrase, backend=default_backend()
-            )
+        key_path = "/home/oneai/oneai-dda-simply-prj0060876_ml/keys/dev_transform_pk.p8"
         config_for_env = config["snowflake_authentication"]["dev"]
+    p_key = _load_private_key(key_path, passphrase)
 
     snowflake_config = SnowflakeAuthentication(**config_for_env)
     if custom_conf:
@@ -228,33 +432,65 @@ def _get_snowflake_connection(
         database=snowflake_config.database,
         role=snowflake_config.role,
         schema=schema,
+        session_parameters={
+            "QUERY_TAG": QUERY_TAG,
+            # results come back as Arrow batches, which _query_snowflake_table converts without a JSON detour
+            "PYTHON_CONNECTOR_QUERY_RESULT_FORMAT": "ARROW",
+        },
     )
 
     return connection
 
 
-def _query_snowflake_table(sql_query: str) -> pd.DataFrame:
+def _query_snowflake_table(sql_query: str, params: Optional[dict] = None, categories: Optional[list] = None) -> pd.DataFrame:
     """
     Wrap snowflake table queries into its own function
     @param sql_query: SQL query string that is going to be executed in snowflake
+    @param params: Optional[dict]. Values bound to the %(name)s placeholders of the query
+    @param categories: Optional[list]. Lowercase names of heavily repeated string columns to return as pandas categoricals
     @return: pandas Data Frame with the query results
     """
-    connection = _get_snowflake_connection()
-    cursor = connection.cursor()
-    try:
-        cursor.execute(sql_query)
-    except Exception:
-        connection.rollback()
-        raise
-    else:
-        data_frame: pd.DataFrame = cursor.fetch_pandas_all()
-        data_frame.columns = data_frame.columns.str.lower()
-        return data_frame
-    finally:
-        cursor.close()
-        connection.close()
+    # The connection is shared by every session: one query (and reconnect) at a time
+    with _connection_lock:
+        connection = _get_shared_connection()
+        if connection.is_closed():
+            # e.g. the session expired on the Snowflake side: open a fresh one
+            _get_shared_connection.clear()
+            connection = _get_shared_connection()
+        cursor = connection.cursor()
+        try:
+            cursor.execute(sql_query, params)
+            # Fetch the Arrow result while holding the lock, the cursor belongs to the shared connection
+            table = cursor.fetch_arrow_all(force_return_table=True)
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    # Convert the Arrow result ourselves so pyarrow can release its buffers while building the frame
+    table = table.rename_columns([name.lower() for name in table.column_names])
+    # categoricals keep one Python string per distinct value instead of one per row
+    data_frame: pd.DataFrame = table.to_pandas(split_blocks=True, self_destruct=True, categories=categories)
+    return data_frame
 
 
+# Serialises the use of the shared connection below: st.cache_resource only guards its creation
+_connection_lock = threading.Lock()
+
+
+@st.cache_resource(show_spinner=False)
+def _get_shared_connection() -> "snowflake.connector.SnowflakeConnection":
+    """
+    Single Snowflake connection reused by all queries of the app instead of
+    authenticating again for every query. It is shared by all sessions, so only use it
+    while holding `_connection_lock` (see `_query_snowflake_table`).
+    @return: SnowflakeConnection
+    """
+    return _get_snowflake_connection()
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
 def read_source_table(schema_name: str, table_name: str, plant_id: Optional[str] = None, stage_name: Optional[str] = None) -> pd.DataFrame:
     """
     Reads data from Snowflake with optional filters for plant_id and stage.
@@ -266,21 +502,25 @@ def read_source_table(schema_name: str, table_name: str, plant_id: Optional[str]
     @return: pd.DataFrame
     """
 
-    # Base query
-    query = f'SELECT * FROM {schema_name}."{table_name}" WHERE 1=1'
+    # Base query, reading only the columns the pivot uses
+    columns = ", ".join(BATCH_KEY_COLUMNS + ["feature_name", "feature_value"])
+    query = f'SELECT {columns} FROM {schema_name}."{table_name}" WHERE 1=1'
+    params = {}
 
-    # Add filters if provided
+    # Add filters if provided (bound by the connector, so Snowflake filters server-side)
     if plant_id:
-        query += f" AND LOWER(plant_id) = '{plant_id.strip().lower()}'"
+        query += " AND LOWER(plant_id) = %(plant_id)s"
+        params["plant_id"] = plant_id.strip().lower()
     if stage_name:
-        query += f" AND LOWER(stage) = '{stage_name.strip().lower()}'"
+        query += " AND LOWER(stage) = %(stage)s"
+        params["stage"] = stage_name.strip().lower()
 
-    # Run query
-    data_frame = _query_snowflake_table(query)
+    # Run query; the key and feature_name strings repeat on every row of the long table
+    data_frame = _query_snowflake_table(query, params, categories=BATCH_KEY_COLUMNS + ["feature_name"])
     return data_frame
 
-from collections import defaultdict
 
+@st.cache_data(ttl=3600, show_spinner=False)
 def get_plant_stage_mapping(schema_name: str, table_name: str) -> dict[str, list[str]]:
     """
     Fetch unique plant_id → stage mappings from Snowflake.
@@ -296,26 +536,41 @@ def get_plant_stage_mapping(schema_name: str, table_name: str) -> dict[str, list
     """
     df = _query_snowflake_table(query)
 
-    mapping = defaultdict(list)
-    for _, row in df.iterrows():
-        mapping[row["plant_id"]].append(row["stage"])
-
     # sort stages for consistency
-    return {k: sorted(set(v)) for k, v in mapping.items()}
+    stages_per_plant = df.groupby("plant_id")["stage"].unique()
+    return {plant_id: sorted(stages) for plant_id, stages in stages_per_plant.items()}
 
 
-def pivot_master_data(master_data: pd.DataFrame) -> pd.DataFrame:
+def pivot_master_data(master_data: pd.DataFrame, reduce_precision: bool = True) -> pd.DataFrame:
     """
     Pivots the data from the master table to have one feature per column.
     @param master_data: DataFrame from MASTER_ML
+    @param reduce_precision: bool. Keep the feature values as float32 (the "Reduce precision" load option), else float64
     @return: melted MASTER_ML DataFrame
     """
 
+    # Coerce the values once up front so the pivot can use pandas' native aggregation
+    value_dtype = np.float32 if reduce_precision else np.float64
+    master_data = master_data.assign(
+        feature_value=pd.to_numeric(master_data["feature_value"], errors="coerce").astype(value_dtype)
+    )
+    # Categorical keys (see read_source_table) group in category order: sort the categories so
+    # rows and feature columns come out in the same order as with plain string keys
+    categorical = master_data.select_dtypes("category").columns
+    master_data = master_data.assign(**{
+        col: master_data[col].cat.reorder_categories(sorted(master_data[col].cat.categories))
+        for col in categorical
+    })
     pivoted_data = master_data.pivot_table(
-        index=['batch_id', 'material_id', 'plant_id', 'stage', 'manufacture_date', 'product_name'],
+        index=BATCH_KEY_COLUMNS,
         columns="feature_name",
         values="feature_value",
-        aggfunc=lambda x: pd.to_numeric(x, errors="coerce").astype(float),
-        fill_value=np.nan,
-    ).reset_index()
-    return pivoted_data
+        aggfunc="mean",
+        observed=True,
+    ).sort_index()
+    pivoted_data.columns = pivoted_data.columns.astype(str)
+    pivoted_data = pivoted_data.reset_index()
+    for col in pivoted_data.select_dtypes("category").columns:
+        # batches whose features were all NaN are dropped by the pivot
+        pivoted_data[col] = pivoted_data[col].cat.remove_unused_categories()
+    return _downcast_floats(pivoted_data) if reduce_precision else pivoted_data
@@ -1,68 +1,130 @@
 import pandas as pd
 import numpy as np
 import streamlit as st
+from src.utils import cached_on_fingerprint, df_fingerprint, map_chunks
+
+def _unique_and_mode(values: np.ndarray):
+    """
+    Number of distinct non-NaN values of every column of a 2D numeric array, its smallest
+    most frequent value (what `Series.mode().iloc[0]` returns) and that value's count,
+    all read off one sort of the column-major data. Columns are sorted a few at a time
+    to bound the temporary memory; on wide frames the chunks run on a small thread pool
+    (the NumPy sorts and reductions release the GIL).
+    """
+    n_rows, n_cols = values.shape
+    n_unique = np.zeros(n_cols, dtype=np.int64)
+    modes = np.zeros(n_cols, dtype=values.dtype)  # only meaningful where counts > 0
+    counts = np.zeros(n_cols, dtype=np.int64)
+    step = max(1, 2**22 // max(n_rows, 1))
+
+    def summarize_chunk(c0):
+        ordered = np.sort(values[:, c0:c0 + step].T, axis=1)  # one row per column, NaNs last
+        # a run starts at each change of value; every NaN starts its own (ignored) run
+        run_start = np.ones(ordered.shape, dtype=bool)
+        np.not_equal(ordered[:, 1:], ordered[:, :-1], out=run_start[:, 1:])
+        starts = np.flatnonzero(run_start)
+        lengths = np.diff(np.append(starts, ordered.size))
+        flat = ordered.ravel()
+        keep = ~np.isnan(flat[starts])
+        starts, lengths = starts[keep], lengths[keep]
+        if not len(starts):
+            return
+        col = starts // n_rows
+        n_unique[c0:c0 + len(ordered)] = np.bincount(col, minlength=len(ordered))
+        # runs are grouped by column in ascending value order: the first longest run wins ties
+        present = np.unique(col)
+        longest = np.maximum.reduceat(lengths, np.searchsorted(col, present))
+        is_best = lengths == longest[np.searchsorted(present, col)]
+        best_col, first = np.unique(col[is_best], return_index=True)
+        best = np.flatnonzero(is_best)[first]
+        modes[c0 + best_col] = flat[starts[best]]
+        counts[c0 + best_col] = lengths[best]
+
+    # each chunk writes its own slice of the outputs
+    map_chunks(summarize_chunk, range(0, n_cols, step), parallel=n_cols > 32)
+    return n_unique, modes, counts
+
 
 def univariate_feature_summary(df: pd.DataFrame, lower_pct=5, upper_pct=95) -> pd.DataFrame:
-    summary = []
-    for col in df.columns:
-        series = df[col]
-        dtype = series.dtype
-        n_unique = series.nunique(dropna=True)
-        n_missing = series.isnull().sum()
-        perc_missing = (n_missing / len(series)) * 100
-
-        if np.issubdtype(dtype, np.number):
-            var = series.var()
-            mean = series.mean()
-            median = series.median()
-            std = series.std()
-            min_val = series.min()
-            max_val = series.max()
-
-            # Percentile-based outlier detection
-            non_na = series.dropna()
-            if not non_na.empty:
-                lower_bound = np.percentile(non_na, lower_pct)
-                upper_bound = np.percentile(non_na, upper_pct)
-                outliers = non_na[(non_na < lower_bound) | (non_na > upper_bound)]
-                n_outliers = outliers.count()
-                perc_outliers = (n_outliers / len(series)) * 100
-            else:
-                lower_bound = upper_bound = np.nan
-                n_outliers = perc_outliers = np.nan
-        else:
-            var = mean = median = std = min_val = max_val = np.nan
-            lower_bound = upper_bound = np.nan
-            n_outliers = perc_outliers = np.nan
-
-        mode_val = series.mode(dropna=True)
-        if not mode_val.empty:
-            top_value = str(mode_val.iloc[0])  # 🔑 ensure string for Arrow compatibility
-            top_freq = (series == mode_val.iloc[0]).sum()
-        else:
-            top_value = np.nan
-            top_freq = np.nan
-
-        summary.append({
-            "feature": col,
-            "dtype": str(dtype),
-            "n_unique": n_unique,
-            "variance": var,
-            "n_missing": n_missing,
-            "%missing": perc_missing,
-            "mean": mean,
-            "median": median,
-            "std_dev": std,
-            "min": min_val,
-            "max": max_val,
-            "top_value": top_value,
-            "top_freq": top_freq,
-            "lower_bound": lower_bound,
-            "upper_bound": upper_bound,
-            "n_outliers": n_outliers,
-            "%outliers": perc_outliers
-        })
-    return pd.DataFrame(summary)
+    n_rows = len(df)
+    num = df.select_dtypes(include="number")
+    n_missing = df.isnull().sum()
+
+    other = df.columns.difference(num.columns, sort=False)
+    variance = num.var()
+
+    # --- Distinct counts and modes: one sort per numeric dtype block, value_counts for the rest ---
+    n_unique = pd.Series(0, index=df.columns)
+    top_value = pd.Series(np.nan, index=df.columns, dtype=object)
+    top_freq = pd.Series(np.nan, index=df.columns)
+    median = pd.Series(np.nan, index=df.columns)
+    min_value = pd.Series(np.nan, index=df.columns)
+    max_value = pd.Series(np.nan, index=df.columns)
+    lower_bound = pd.Series(np.nan, index=df.columns)
+    upper_bound = pd.Series(np.nan, index=df.columns)
+    n_outliers = pd.Series(np.nan, index=df.columns)
+    for dtype in num.dtypes.unique():
+        block = num.loc[:, num.dtypes == dtype]
+        values = block.to_numpy()
+        uniques, modes, counts = _unique_and_mode(values)
+        n_unique[block.columns] = uniques
+        found = counts > 0  # columns with at least one value
+        top_value[block.columns[found]] = [str(v) for v in modes[found]]  # str for Arrow compatibility
+        top_freq[block.columns[found]] = counts[found]
+
+        # --- Median, range and percentile-based outlier bounds: one pass for all columns of the block ---
+        if found.any():
+            values = values[:, found] if not found.all() else values
+            lo, med, hi = np.nanpercentile(values, [lower_pct, 50, upper_pct], axis=0)
+            # float blocks keep their precision for the median, like Series.median
+            median[block.columns[found]] = med.astype(values.dtype) if values.dtype.kind == "f" else med
+            min_value[block.columns[found]] = np.nanmin(values, axis=0)
+            max_value[block.columns[found]] = np.nanmax(values, axis=0)
+            lower_bound[block.columns[found]] = lo
+            upper_bound[block.columns[found]] = hi
+            n_outliers[block.columns[found]] = ((values < lo) | (values > hi)).sum(axis=0)
+    for col in other:
+        # one hash pass gives the distinct count, the mode and its frequency
+        counts = df[col].value_counts(dropna=True)
+        n_unique[col] = len(counts)
+        if len(counts):
+            tied = counts.index[counts.to_numpy() == counts.iloc[0]]
+            try:
+                top = tied.sort_values()[0]  # smallest on ties, like Series.mode
+            except TypeError:
+                top = tied[0]
+            top_value[col] = str(top)
+            top_freq[col] = counts.iloc[0]
+
+    summary = pd.DataFrame({
+        "feature": df.columns,
+        "dtype": df.dtypes.astype(str),
+        "n_unique": n_unique,
+        "variance": variance,
+        "n_missing": n_missing,
+        "%missing": (n_missing / n_rows) * 100,
+        "mean": num.mean(),
+        "median": median,
+        "std_dev": np.sqrt(variance),  # same as num.std(), without a second variance pass
+        "min": min_value,
+        "max": max_value,
+        "top_value": top_value,
+        "top_freq": top_freq,
+        "lower_bound": lower_bound,
+        "upper_bound": upper_bound,
+        "n_outliers": n_outliers,
+        "%outliers": (n_outliers / n_rows) * 100,
+    }, index=df.columns)
+    for col in ["top_freq", "n_outliers"]:
+        # counts stay integers unless some column has no value for them
+        if summary[col].notna().all():
+            summary[col] = summary[col].astype(np.int64)
+    return summary.reset_index(drop=True)
+
+
+@cached_on_fingerprint(max_entries=4)
+def _summary_core(df_hash, df: pd.DataFrame, lower_pct, upper_pct) -> pd.DataFrame:
+    return univariate_feature_summary(df, lower_pct, upper_pct)
 
 
 def show_data_summary(df: pd.DataFrame) -> pd.DataFrame:
@@ -71,16 +133,18 @@ def show_data_summary(df: pd.DataFrame) -> pd.DataFrame:
         st.warning("No data loaded.")
         return pd.DataFrame()
 
-    # Outlier percentile inputs
-    st.markdown("**Outlier detection thresholds**")
-    col1, col2 = st.columns(2)
-    with col1:
-        lower_pct = st.slider("Lower percentile", 0, 20, 5)
-    with col2:
-        upper_pct = st.slider("Upper percentile", 80, 100, 95)
+    # Outlier percentile inputs (in a form: the summary is only recomputed on submit, not mid-drag)
+    with st.form("outlier_thresholds", clear_on_submit=False):
+        st.markdown("**Outlier detection thresholds**")
+        col1, col2 = st.columns(2)
+        with col1:
+            lower_pct = st.slider("Lower percentile", 0, 20, 5)
+        with col2:
+            upper_pct = st.slider("Upper percentile", 80, 100, 95)
+        st.form_submit_button("Apply thresholds")
 
     # Build summary
-    df_summary = univariate_feature_summary(df, lower_pct, upper_pct)
+    df_summary = _summary_core(df_fingerprint(df), df, lower_pct, upper_pct)
 
     # KPIs
     numeric_rows = df_summary[df_summary["variance"].notna()]
@@ -130,15 +194,17 @@ def show_data_summary(df: pd.DataFrame) -> pd.DataFrame:
     # Filters
     st.markdown("---")
     st.markdown("### 🎛️ Filters")
-    c1, c2, c3, c4 = st.columns(4)
-    with c1:
-        min_unique = st.number_input("Min n_unique", min_value=1, value=2, step=1)
-    with c2:
-        dtype_filter = st.selectbox("Dtype filter", ["Numeric only", "All types"], index=0)
-    with c3:
-        max_missing = st.slider("Max %missing", 0, 100, 80, 1)
-    with c4:
-        min_variance = st.number_input("Min variance (numeric)", value=0.0, step=0.001)
+    with st.form("summary_filters", clear_on_submit=False):
+        c1, c2, c3, c4 = st.columns(4)
+        with c1:
+            min_unique = st.number_input("Min n_unique", min_value=1, value=2, step=1)
+        with c2:
+            dtype_filter = st.selectbox("Dtype filter", ["Numeric only", "All types"], index=0)
+        with c3:
+            max_missing = st.slider("Max %missing", 0, 100, 80, 1)
+        with c4:
+            min_variance = st.number_input("Min variance (numeric)", value=0.0, step=0.001)
+        st.form_submit_button("Apply filters")
 
     filtered = df_summary.copy()
     filtered = filtered[filtered["n_unique"] > (min_unique - 1)]
@@ -2,7 +2,8 @@ import streamlit as st
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-from sklearn.impute import SimpleImputer
+from src.utils import (bin_code_dtype, cached_on_fingerprint, df_fingerprint, fill_missing, grouped_bincount, map_chunks,
+                       numeric_columns, numeric_matrix)
 
 # ---------- Utility Functions ----------
 # ---------- Utility: target binning ----------
@@ -27,66 +28,294 @@ def bin_target_for_iv(s: pd.Series, method: str = "median", cutoff=None, q=0.5)
     else:
         raise ValueError("Unknown binning method for target.")
 
+def _iv_kernel(codes: np.ndarray, y: np.ndarray, n_bins: int):
+    """
+    Per-bin counts, WoE and IV contributions of several binned features, counted in a single
+    pass over all of them (see `grouped_bincount`). `codes` is (rows, features) with the bin of each row (0..n_bins-1)
+    or -1 for rows a feature doesn't use; `y` is the 0/1 target per row.
+    Returns (count, good, bad, dist, woe, iv_bin), shaped (features, n_bins) except `dist`, which
+    holds the Good and Bad shares of each bin side by side, shaped (features, n_bins, 2).
+    WoE is ln(%Good/%Bad); a bin holding a single class has 0.5 added to its Good and Bad
+    counts instead, so it gets a large but finite WoE (a leaking feature still scores a high
+    IV). Unused bins get a WoE and IV contribution of 0.
+    """
+    count, good = grouped_bincount(codes, n_bins, y == 1)
+    good = good.astype(count.dtype)
+    bad = count - good
+
+    counts = np.stack((good, bad), axis=-1)
+    totals = np.maximum(counts.sum(axis=1, keepdims=True), 1)  # 0 only for a class the feature never sees
+    dist = counts / totals
+    dist_good, dist_bad = dist[..., 0], dist[..., 1]
+    # WoE = ln(%Good/%Bad); only single-class bins are smoothed (+0.5 per class) to stay finite
+    one_class = (count > 0) & ((good == 0) | (bad == 0))
+    shares = np.where(one_class[..., None], (counts + 0.5) / totals, dist)
+    woe = np.zeros(dist_good.shape)
+    with np.errstate(invalid="ignore", divide="ignore"):  # unused bins, masked out by `where`
+        np.log(shares[..., 0] / shares[..., 1], out=woe, where=count > 0)
+    iv_bin = (dist_good - dist_bad) * woe
+    return count, good, bad, dist, woe, iv_bin
+
+
+def _sorted_quantiles(ordered: np.ndarray, n_valid: np.ndarray, qs: np.ndarray) -> np.ndarray:
+    """
+    Quantiles `qs` of every column of `ordered`, whose columns are sorted with their NaNs last
+    and hold `n_valid` values each. Same linear interpolation (and bit-identical results) as
+    np.quantile on each column's values, without partitioning every column again.
+    Returns an array shaped (len(qs), columns).
+    """
+    virtual = (n_valid - 1) * qs[:, None]
+    below = np.floor(virtual).astype(np.intp)
+    above = np.minimum(below + 1, n_valid - 1)
+    lo = np.take_along_axis(ordered, below, axis=0)
+    hi = np.take_along_axis(ordered, above, axis=0)
+    gamma = virtual - below
+    step = hi - lo
+    edges = lo + step * gamma
+    np.subtract(hi, step * (1 - gamma), out=edges, where=gamma >= 0.5)  # as np.quantile's lerp
+    return edges
+
+
+def _iv_all(X: np.ndarray, y: np.ndarray, bins: int) -> dict:
+    """
+    IV/WoE of every column of X against the 0/1 target y. Each column is cut on its own
+    quantile edges, skipping its NaNs. Columns are binned and counted a few at a time to
+    bound the temporary memory; on wide frames the chunks run on a small thread pool (the
+    NumPy sort, comparison and bincount calls release the GIL).
+    Returns a columnar store with one row per usable column (at least 2 non-empty bins and
+    both classes): "cols" (its position in X), "n_bins", "edges" (k, bins + 1; the edges of
+    its non-empty bins, NaN after them), "count", "good", "bad", "woe", "iv_bin" (k, bins;
+    0 after its n_bins), "dist" (k, bins, 2; Good/Bad shares) and "iv" (total IV). See `_iv_bins`.
+    """
+    n_rows, n_cols = X.shape
+    step = max(1, 2**22 // max(n_rows, 1))
+    qs = np.linspace(0, 1, bins + 1)
+
+    def score_chunk(c0):
+        block = X[:, c0:c0 + step]
+        missing = np.isnan(block)
+        n_valid = n_rows - missing.sum(axis=0)
+
+        # Quantile edges of all columns from one sort of the chunk (NaNs sort last)
+        edges = _sorted_quantiles(np.sort(block, axis=0), np.maximum(n_valid, 1), qs)
+
+        # Right-closed bins like qcut: the bin of a value is the number of inner edges below
+        # it. Tied values share a bin, and repeated edges only count once (duplicates dropped)
+        distinct = edges[1:] != edges[:-1]
+        codes = np.zeros(block.shape, dtype=bin_code_dtype(bins))
+        for inner, counted in zip(edges[1:-1], distinct[:-1]):
+            codes += (block > inner) & counted
+        codes[missing] = -1
+
+        count, good, bad, dist, woe, iv_bin = _iv_kernel(codes, y, bins)
+        # Ties can leave a bin between distinct edges empty (e.g. "(1, 1.5]" on integer data);
+        # only the filled bins count, and the others (including unused ones) are dropped below
+        filled = count > 0
+        n_bins = filled.sum(axis=1)
+        # Need at least 2 bins, and both classes (not all one class)
+        usable = np.flatnonzero((n_bins >= 2) & (good.sum(axis=1) > 0) & (bad.sum(axis=1) > 0))
+        filled = filled[usable]
+
+        # The edges are sorted, so each column's distinct edges (its np.unique) are the
+        # first one and those that differ from their predecessor: move them to the front
+        first = np.ones(edges.shape, dtype=bool)
+        first[1:] = distinct
+        order = np.argsort(~first[:, usable], axis=0, kind="stable")
+        unique_edges = np.take_along_axis(edges[:, usable], order, axis=0).T
+        # An empty bin is merged into the next one by dropping its right edge (the first and
+        # last bins hold the minimum and maximum, so they are never empty)
+        keep_edge = np.ones(unique_edges.shape, dtype=bool)
+        keep_edge[:, 1:] = filled
+        order = np.argsort(~keep_edge, axis=1, kind="stable")
+        unique_edges = np.take_along_axis(unique_edges, order, axis=1)
+        unique_edges[np.arange(bins + 1) > n_bins[usable, None]] = np.nan
+
+        # Filled bins first, in bin order
+        order = np.argsort(~filled, axis=1, kind="stable")
+        store = {
+            key: np.take_along_axis(a[usable], order if a.ndim == 2 else order[..., None], axis=1)
+            for key, a in (("count", count), ("good", good), ("bad", bad), ("dist", dist), ("woe", woe), ("iv_bin", iv_bin))
+        }
+        store.update({"cols": c0 + usable, "n_bins": n_bins[usable], "edges": unique_edges, "iv": store["iv_bin"].sum(axis=1)})
+        return store
+
+    # each chunk scores its own columns
+    return _concat_stores(map_chunks(score_chunk, range(0, max(n_cols, 1), step)))
+
+
+def _concat_stores(stores: list) -> dict:
+    """
+    One columnar store from several with the same keys, their rows in order.
+    """
+    return {key: np.concatenate([store[key] for store in stores]) for key in stores[0]}
+
+
+def _iv_bins(store: dict, i: int) -> tuple:
+    """
+    (edges, count, good, bad, dist, woe, iv_bin) of row i of an IV store, one entry per bin
+    (n_bins + 1 edges; a Good/Bad share pair for `dist`).
+    """
+    n = store["n_bins"][i]
+    return (store["edges"][i, :n + 1],) + tuple(
+        store[key][i, :n] for key in ("count", "good", "bad", "dist", "woe", "iv_bin")
+    )
+
+
+def _iv_table(feature: str, store: dict, i: int) -> pd.DataFrame:
+    """
+    Per-bin IV table of one feature from row i of its IV store.
+    """
+    edges, count, good, bad, dist, woe, iv_bin = _iv_bins(store, i)
+    return pd.DataFrame({
+        f"{feature}_bin": _bin_labels(edges),
+        "count": count,
+        "good": good,
+        "bad": bad,
+        "dist_good": dist[:, 0],
+        "dist_bad": dist[:, 1],
+        "woe": woe,
+        "iv_bin": iv_bin,
+    })
+
+
+def _n_distinct(X: np.ndarray) -> np.ndarray:
+    """
+    Number of distinct non-NaN values in each column of X, from one sort of the columns.
+    """
+    X = np.sort(X, axis=0)  # NaNs last; comparisons with them are False
+    with np.errstate(invalid="ignore"):  # inf - inf
+        changes = (np.diff(X, axis=0) > 0).sum(axis=0)
+    return (~np.isnan(X[:1])).sum(axis=0) + changes
+
+
+def _bin_labels(edges: np.ndarray) -> list:
+    """
+    Interval labels for the bins between consecutive edges, e.g. "[0.1, 2.5]", "(2.5, 7]".
+    The first bin includes its lower edge. Uses just enough significant digits to tell
+    all edges apart.
+    """
+    edges = edges + 0.0  # shows -0.0 edges as 0
+    for digits in range(4, 18):
+        text = [f"{e:.{digits}g}" for e in edges]
+        if len(set(text)) == len(text):
+            break
+    return [f"{'[' if i == 0 else '('}{text[i]}, {text[i + 1]}]" for i in range(len(edges) - 1)]
+
+
 def compute_iv(df, feature, target, bins=5):
     """
-    Compute IV/WoE for a feature.
+    Compute IV/WoE for a feature: a thin wrapper over `_iv_all` and `_iv_table`, the same
+    binning and WoE as the IV tab.
     Assumes 'target' is binary numeric (0/1). Does NOT mutate df.
     """
     try:
-        tmp = df[[feature, target]].dropna().copy()
-        if tmp.empty:
-            return None, None
+        x = df[feature].to_numpy(dtype=np.float64, na_value=np.nan)
+        y = df[target].to_numpy()
+        keep = ~pd.isna(y)
+        x, y = x[keep], y[keep]
 
         # sanity: ensure binary 0/1
-        uniq = set(tmp[target].unique())
-        if not uniq.issubset({0, 1}):
+        if not np.isin(y, (0, 1)).all():
             return None, None
+        if not (y == 1).any() or (y == 1).all():
+            return None, None  # IV needs both classes
 
-        bin_col = f"{feature}_bin"
-        tmp[bin_col] = pd.qcut(tmp[feature].rank(method="first"), q=bins, duplicates="drop")
-
-        # Need at least 2 bins
-        if tmp[bin_col].nunique() < 2:
+        store = _iv_all(x[:, None], y, bins)
+        if not len(store["iv"]):
             return None, None
-
-        # Count Goods/Bads per bin
-        bin_stats = tmp.groupby(bin_col)[target].agg(['count', 'sum'])
-        bin_stats.rename(columns={"sum": "good"}, inplace=True)
-        bin_stats["bad"] = bin_stats["count"] - bin_stats["good"]
-
-        total_good = bin_stats["good"].sum()
-        total_bad = bin_stats["bad"].sum()
-        if total_good == 0 or total_bad == 0:
-            # degenerate: all one class
-            return None, None
-
-        bin_stats["dist_good"] = bin_stats["good"] / (total_good + 1e-10)
-        bin_stats["dist_bad"]  = bin_stats["bad"]  / (total_bad  + 1e-10)
-        bin_stats["woe"] = np.log((bin_stats["dist_good"] + 1e-10) / (bin_stats["dist_bad"] + 1e-10))
-        bin_stats["iv_bin"] = (bin_stats["dist_good"] - bin_stats["dist_bad"]) * bin_stats["woe"]
-        iv_value = float(bin_stats["iv_bin"].sum())
-        return bin_stats.reset_index(), iv_value
+        return _iv_table(feature, store, 0), float(store["iv"][0])
     except Exception:
         return None, None
 
+# IV strength bands: IV below IV_STRENGTH_EDGES[0] is "Not useful", and so on upwards
+IV_STRENGTH_EDGES = np.array([0.02, 0.1, 0.3, 0.5])
+IV_STRENGTH_LABELS = np.array(["Not useful", "Weak", "Medium", "Strong", "Suspicious / Too good"])
+
+
 def categorize_iv(iv_value):
-    if iv_value < 0.02:
-        return "Not useful"
-    elif iv_value < 0.1:
-        return "Weak"
-    elif iv_value < 0.3:
-        return "Medium"
-    elif iv_value < 0.5:
-        return "Strong"
-    else:
-        return "Suspicious / Too good"
+    """
+    Strength label of an IV value, or an array of labels for an array of values
+    (one np.digitize pass instead of a Python call per feature).
+    """
+    labels = IV_STRENGTH_LABELS[np.digitize(iv_value, IV_STRENGTH_EDGES)]
+    return labels if np.ndim(labels) else str(labels)
+
+
+# The UI scores the features in about this many batches (of at least IV_BATCH_MIN features)
+# and advances its progress bar after each one
+IV_PROGRESS_STEPS = 10
+IV_BATCH_MIN = 64
+
+
+# Bounded to a few runs' worth of batches (a run is at most about IV_PROGRESS_STEPS batches)
+@cached_on_fingerprint(max_entries=4 * IV_PROGRESS_STEPS)
+def _compute_iv_batch(df_hash, num_mat, target_id, feats: tuple, feat_ids: tuple, impute_target, target_imp,
+                      target_bin_method, q_val, cutoff_val, impute_feat, feat_m, feat_bins):
+    """
+    Per-bin IV statistics and IV value of the usable features among `feats` for the given target
+    and settings, so reruns that only change the displayed feature or table skip the work.
+    `num_mat` is the shared numeric matrix from `numeric_matrix`; `target_id` and `feat_ids` are
+    the target's and the features' columns in it. The UI scores the features a batch at a time
+    to report progress.
+    Returns the `_iv_all` store of the usable features, with their names under "feats", or
+    None when no row has a target; the per-bin table is only built (`_iv_table`) for the
+    feature on display.
+    """
+    # ---- Target handling: copy the target out of the shared (read-only) matrix ----
+    y = num_mat[:, target_id].astype(np.float64)
+
+    # Target imputation (optional; an all-NaN target has nothing to impute from)
+    if impute_target and 0 < np.isnan(y).sum() < len(y):
+        fill_missing(y[:, None], target_imp)
+
+    # Drop rows with missing target after optional imputation
+    has_target = ~np.isnan(y)
+    if not has_target.any():
+        return None
+    y = y[has_target]
+
+    # Bin target to numeric 0/1 for IV (a ValueError for unusable settings reaches the caller);
+    # int8 is all a 0/1 flag needs, the features keep the matrix dtype and the bin counts int64
+    good = bin_target_for_iv(
+        pd.Series(y), method=target_bin_method, cutoff=cutoff_val, q=q_val
+    ).to_numpy(dtype=np.int8)
+    if good.min() == good.max():
+        return None  # a single class: no feature can have both Goods and Bads
+
+    # ---- Feature matrix: the batch's features of the rows with a target ----
+    X = num_mat[:, list(feat_ids)]  # column-contiguous copy, imputed in place below
+    if not has_target.all():
+        X = X[has_target]
+
+    # ---- Feature imputation, in place in X ----
+    if impute_feat:
+        n_missing = np.isnan(X).sum(axis=0)
+        # Columns that are entirely NaN (mean/median can't compute): fill with 0
+        X[:, n_missing == len(X)] = 0.0
+        to_fill = np.flatnonzero((n_missing > 0) & (n_missing < len(X)))
+        if len(to_fill):
+            X[:, to_fill] = fill_missing(X[:, to_fill], feat_m)
+
+    # ---- Build IV reports ----
+    # Skip low-variance / near-constant features (qcut cannot form bins): at least 5 distinct
+    # values are needed. Constant and all-NaN columns drop out on their range; the others are
+    # counted on their first rows, and only those with fewer values there are counted in full
+    keep = np.flatnonzero(np.fmin.reduce(X, axis=0) < np.fmax.reduce(X, axis=0))
+    few = keep[_n_distinct(X[:4096, keep]) < 5]
+    keep = np.setdiff1d(keep, few[_n_distinct(X[:, few]) < 5])
+
+    # Score all candidates in one pass over the feature matrix
+    store = _iv_all(X[:, keep], good, feat_bins)
+    store["feats"] = np.array(feats, dtype=object)[keep[store.pop("cols")]]
+    return store
 
 
 # ---------- Main IV Analysis UI ----------
 
 def show_iv_analysis(df, target_col=None, key_prefix: str = "iv"):
     """Add a unique key_prefix when calling from different pages/sections to avoid collisions.
-       Requires `compute_iv` and `categorize_iv` to be defined in scope.
+       Features are scored a batch at a time by `_compute_iv_batch` (binning and WoE in `_iv_all`);
+       only the selected feature's table is built, by `_iv_table`.
     """
     st.subheader("📊 Information Value (IV) — Feature Predictive Power")
 
@@ -97,24 +326,8 @@ def show_iv_analysis(df, target_col=None, key_prefix: str = "iv"):
     # Helper for namespaced keys
     wkey = lambda name: f"{key_prefix}_{name}"
 
-    # Helper: bin target into numeric 0/1
-    def _bin_target_for_iv(s: pd.Series, method: str = "median", cutoff=None, q=0.5) -> pd.Series:
-        """Returns a numeric 0/1 series where 1='good', 0='bad'."""
-        if method == "median":
-            thr = s.median()
-            return (s >= thr).astype(int)
-        elif method == "quantile":
-            thr = s.quantile(float(q))
-            return (s >= thr).astype(int)
-        elif method == "cutoff":
-            if cutoff is None:
-                raise ValueError("cutoff must be provided when method='cutoff'")
-            return (s >= float(cutoff)).astype(int)
-        else:
-            raise ValueError("Unknown binning method for target.")
-
     # ---- Column detection ----
-    numeric_cols = df.select_dtypes(include="number").columns.tolist()
+    numeric_cols = numeric_columns(df)
     if not numeric_cols:
         st.warning("⚠️ No numeric columns detected.")
         return
@@ -185,70 +398,33 @@ def show_iv_analysis(df, target_col=None, key_prefix: str = "iv"):
             key=wkey("feat_bins"),
         )
 
-    # ---- Clean copy & target handling ----
-    df_clean = df.copy()
-
-    # Target imputation (optional)
-    if impute_target and df_clean[target_col].isna().any():
-        df_clean[target_col] = SimpleImputer(strategy=target_imp).fit_transform(
-            df_clean[[target_col]]
-        ).ravel()
-
-    # Drop rows with missing target after optional imputation
-    df_clean = df_clean.dropna(subset=[target_col])
-
-    # Bin target to numeric 0/1 for IV
+    # ---- Build IV reports (cached per data + settings, a batch of features at a time) ----
+    num_mat, col_idx = numeric_matrix(df)
+    df_hash = df_fingerprint(df)
+    feats = [c for c in numeric_cols if c != target_col]
+    step = max(IV_BATCH_MIN, -(-len(feats) // IV_PROGRESS_STEPS))
+    stores = []
+    progress = st.progress(0.0, text="🔄 Computing IV…")
     try:
-        if target_bin_method == "median":
-            df_clean["__iv_target__"] = _bin_target_for_iv(df_clean[target_col], method="median")
-        elif target_bin_method == "quantile":
-            df_clean["__iv_target__"] = _bin_target_for_iv(df_clean[target_col], method="quantile", q=q_val)
-        else:
-            df_clean["__iv_target__"] = _bin_target_for_iv(df_clean[target_col], method="cutoff", cutoff=cutoff_val)
-    except Exception as e:
+        for start in range(0, len(feats), step):
+            batch = tuple(feats[start:start + step])
+            store = _compute_iv_batch(
+                df_hash, num_mat, col_idx[target_col], batch, tuple(col_idx[c] for c in batch),
+                impute_target, target_imp, target_bin_method, q_val, cutoff_val,
+                impute_feat, feat_m, feat_bins,
+            )
+            if store is not None:
+                stores.append(store)
+            done = start + len(batch)
+            progress.progress(done / len(feats), text=f"🔄 Computing IV… {done:,} of {len(feats):,} features")
+    except ValueError as e:
         st.error(f"Failed to bin target for IV: {e}")
         return
+    finally:
+        progress.empty()
 
-    # ---- Feature imputation (exclude target & __iv_target__) ----
-    if impute_feat:
-        num_cols_all = df_clean.select_dtypes(include="number").columns.tolist()
-        feat_cols = [c for c in num_cols_all if c not in (target_col, "__iv_target__") and df_clean[c].isna().any()]
-        if feat_cols:
-            X = df_clean[feat_cols]
-
-            # 1) Handle columns that are entirely NaN (mean/median can't compute)
-            all_nan_cols = [c for c in feat_cols if X[c].isna().all()]
-            if all_nan_cols:
-                # choose a sensible default; 0 is common, or switch to 'most_frequent'
-                df_clean[all_nan_cols] = 0.0
-                # keep only the columns that still need imputation
-                feat_cols = [c for c in feat_cols if c not in all_nan_cols]
-                X = df_clean[feat_cols]
-
-            # 2) If anything remains, impute and REWRAP as DataFrame to preserve shape/labels
-            if feat_cols:
-                imputer = SimpleImputer(strategy=feat_m)
-                X_imp = imputer.fit_transform(X)             # ndarray (n_rows, n_cols)
-                X_imp = pd.DataFrame(X_imp, columns=feat_cols, index=df_clean.index)
-            df_clean[feat_cols] = X_imp
-
-    # ---- Build IV reports using __iv_target__ ----
-    iv_reports = {}
-    feature_iv_scores = {}
-
-    numeric_cols_iv = df_clean.select_dtypes(include="number").columns.tolist()
-    candidate_feats = [c for c in numeric_cols_iv if c not in (target_col, "__iv_target__")]
-
-    for feat in candidate_feats:
-        # Skip low-variance / near-constant features (qcut cannot form bins)
-        if df_clean[feat].nunique(dropna=True) < 5:
-            continue
-        bin_df, iv_val = compute_iv(df_clean, feat, "__iv_target__", bins=feat_bins)
-        if bin_df is not None:
-            iv_reports[feat] = bin_df
-            feature_iv_scores[feat] = float(iv_val)
-
-    if not iv_reports:
+    iv_store = _concat_stores(stores) if stores else None
+    if iv_store is None or not len(iv_store["feats"]):
         st.error(
             "❌ No valid features for IV analysis.\n\n"
             "Tips:\n"
@@ -259,22 +435,25 @@ def show_iv_analysis(df, target_col=None, key_prefix: str = "iv"):
         return
 
     # ---- Feature selector ----
+    feat_names = list(iv_store["feats"])
     s1, s2 = st.columns([3, 1])
     with s1:
-        selected_feat = st.selectbox("🎯 Select feature", list(iv_reports.keys()), key=wkey("feature_selector"))
+        selected_feat = st.selectbox("🎯 Select feature", feat_names, key=wkey("feature_selector"))
     with s2:
         show_table = st.checkbox("📋 Show IV table", value=True, key=wkey("show_table"))
 
     if not selected_feat:
         return
 
-    iv_df = iv_reports[selected_feat]
-    iv_val = feature_iv_scores[selected_feat]
+    feat_pos = feat_names.index(selected_feat)
+    edges, _, _, _, dist, woe, _ = _iv_bins(iv_store, feat_pos)
+    iv_val = float(iv_store["iv"][feat_pos])
+    bin_labels = _bin_labels(edges)
 
-    # ---- Table view ----
+    # ---- Table view (only the displayed feature's table is built) ----
     if show_table:
         styled_df = (
-            iv_df.style
+            _iv_table(selected_feat, iv_store, feat_pos).style
             .format({'good': '{:.0f}', 'bad': '{:.0f}', 'dist_good': '{:.3f}', 'dist_bad': '{:.3f}', 'woe': '{:.3f}', 'iv_bin': '{:.3f}'})
         )
         st.write(f"**IV Table for feature: {selected_feat} (IV = {iv_val:.3f}, Strength = {categorize_iv(iv_val)})**")
@@ -282,13 +461,13 @@ def show_iv_analysis(df, target_col=None, key_prefix: str = "iv"):
 
     # ---- Plot WoE ----
     fig = go.Figure(go.Bar(
-        x=iv_df[f"{selected_feat}_bin"].astype(str),
-        y=iv_df["woe"],
-        text=[f"{v:.2f}" for v in iv_df["woe"]],
+        x=bin_labels,
+        y=woe,
+        text=np.char.mod("%.2f", woe),
         textposition='outside',
         marker_color="royalblue",
         hovertemplate="Bin: %{x}<br>WoE: %{y:.3f}<br>Good%: %{customdata[0]:.3f}<br>Bad%: %{customdata[1]:.3f}<extra></extra>",
-        customdata=np.stack([iv_df["dist_good"], iv_df["dist_bad"]], axis=-1)
+        customdata=dist,  # (n_bins, 2): Good% and Bad% per bin
     ))
     fig.update_layout(
         title=f"Weight of Evidence (WoE) — {selected_feat}",
@@ -307,17 +486,15 @@ def show_iv_analysis(df, target_col=None, key_prefix: str = "iv"):
         st.metric("Strength", categorize_iv(iv_val))
     with c2:
         st.subheader("🎯 Predictive Insight")
-        st.metric("Max WoE", f"{iv_df['woe'].max():.3f}")
-        st.metric("Min WoE", f"{iv_df['woe'].min():.3f}")
-        st.metric("Avg WoE", f"{iv_df['woe'].mean():.3f}")
+        st.metric("Max WoE", f"{woe.max():.3f}")
+        st.metric("Min WoE", f"{woe.min():.3f}")
+        st.metric("Avg WoE", f"{woe.mean():.3f}")
 
     # ---- All Features IV ranking ----
     st.markdown("### 📊 IV Ranking Across Features")
-    iv_rank_df = pd.DataFrame(
-        sorted(feature_iv_scores.items(), key=lambda x: x[1], reverse=True),
-        columns=["Feature", "IV"]
-    )
-    iv_rank_df["Strength"] = iv_rank_df["IV"].apply(categorize_iv)
+    order = np.argsort(-iv_store["iv"], kind="stable")  # highest IV first, ties in column order
+    iv_rank_df = pd.DataFrame({"Feature": iv_store["feats"][order], "IV": iv_store["iv"][order]})
+    iv_rank_df["Strength"] = categorize_iv(iv_rank_df["IV"].to_numpy())
     st.dataframe(iv_rank_df.style.format({'IV': '{:.3f}'}), use_container_width=True)
 
     # ---- Interpretation ----
@@ -325,7 +502,7 @@ def show_iv_analysis(df, target_col=None, key_prefix: str = "iv"):
         "📖 **Information Value (IV) Procedure**\n"
         "1. Bin feature values\n"
         "2. Compute Good% and Bad% in each bin\n"
-        "3. Calculate Weight of Evidence (WoE = ln(%Good/%Bad))\n"
+        "3. Calculate Weight of Evidence (WoE = ln(%Good/%Bad), with 0.5 added to both counts of a bin that lacks one class)\n"
         "4. Compute IV per bin = (%Good - %Bad) × WoE\n"
         "5. Sum across bins → IV(feature)\n\n"
         "**Guidelines:**\n"
@@ -2,50 +2,77 @@ import streamlit as st
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-from sklearn.impute import SimpleImputer
+from src.utils import (bin_code_dtype, cached_on_fingerprint, df_fingerprint, fill_missing, grouped_bincount,
+                       numeric_columns, numeric_matrix)
 
-@st.cache_data(show_spinner=False, persist=True)
-def build_lift_reports(df, target, impute_target, target_imp, impute_feat, feat_imp, feat_bins):
-    df_clean = df.copy()
+
+@cached_on_fingerprint(persist=True)
+def build_lift_reports(df_hash, num_mat, col_idx, target, impute_target, target_imp, impute_feat, feat_imp, feat_bins):
+    """
+    Lift table per numeric feature. `num_mat` / `col_idx` are the shared numeric matrix
+    and its column lookup from `numeric_matrix`.
+    """
+    feats = [c for c in col_idx if c != target]
+
+    # --- Copy the target and the feature columns out of the shared (read-only) matrix ---
+    y = num_mat[:, col_idx[target]].astype(np.float64)
+    X = num_mat[:, [col_idx[c] for c in feats]]
 
     # --- Impute target if requested ---
-    if impute_target and df_clean[target].isna().any():
-        df_clean[target] = SimpleImputer(strategy=target_imp).fit_transform(df_clean[[target]]).ravel()
+    if impute_target and 0 < np.isnan(y).sum() < len(y):
+        fill_missing(y[:, None], target_imp)
 
     # --- Impute numeric features if requested ---
-    num_cols = df_clean.select_dtypes(include="number").columns.tolist()
     if impute_feat:
-        feat_cols = [c for c in num_cols if c != target and df_clean[c].isna().any()]
-        if feat_cols:
-            df_clean[feat_cols] = SimpleImputer(strategy=feat_imp).fit_transform(df_clean[feat_cols])
+        # all-NaN columns have nothing to impute from
+        n_missing = np.isnan(X).sum(axis=0)
+        to_fill = np.flatnonzero((n_missing > 0) & (n_missing < len(X)))
+        if len(to_fill):
+            X[:, to_fill] = fill_missing(X[:, to_fill], feat_imp)
 
     # --- Drop rows with missing target ---
-    df_clean = df_clean.dropna(subset=[target])
+    has_target = ~np.isnan(y)
+    if not has_target.any():
+        return {}
+    if not has_target.all():
+        y, X = y[has_target], X[has_target]
 
     # --- Bin target into 2 classes using median ---
-    med = df_clean[target].median()
-    df_clean["target_bin"] = pd.cut(df_clean[target], [-np.inf, med, np.inf], labels=["bad", "good"])
-    overall = (df_clean["target_bin"] == "good").mean()
+    good = (y > np.median(y)).astype(np.float64)  # "good" = above the median
+    overall = good.mean()
+
+    # --- Rank every feature at once; ties keep row order like rank(method="first"), NaNs sort last ---
+    valid = ~np.isnan(X)
+    n_valid = valid.sum(axis=0)
+    order = X.argsort(axis=0, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(len(X))[:, None], axis=0)  # invert the permutation, no 2nd sort
+
+    # --- Bin codes per feature (-1 = row not used) ---
+    # qcut of the ranks 1..m only depends on m, so bin them once per distinct non-null count
+    rank_bins = {}
+    kept = [j for j in range(len(feats)) if n_valid[j] >= 10]  # skip sparse features
+    codes = np.full((X.shape[0], len(kept)), -1, dtype=bin_code_dtype(feat_bins))
+    for i, j in enumerate(kept):
+        m = n_valid[j]
+        if m not in rank_bins:
+            rank_bins[m] = pd.qcut(np.arange(1, m + 1), q=feat_bins, duplicates="drop")
+        codes[valid[:, j], i] = rank_bins[m].codes[ranks[valid[:, j], j]]
 
     # --- Build lift tables per feature ---
+    count, good_sum = grouped_bincount(codes, feat_bins, good)
     reports = {}
-    for feat in (c for c in num_cols if c != target):
-        if df_clean[feat].notna().sum() < 10:  # skip sparse features
-            continue
-        try:
-            df_clean[f"{feat}_bin"] = pd.qcut(
-                df_clean[feat].rank(method="first"), q=feat_bins, duplicates="drop"
-            )
-            bin_df = (
-                df_clean.groupby(f"{feat}_bin")["target_bin"]
-                .apply(lambda x: (x == "good").mean())
-                .reset_index(name="good_rate")
-            )
-            bin_df["lift"] = bin_df["good_rate"] / overall
-            bin_df["count"] = df_clean.groupby(f"{feat}_bin").size().values
-            reports[feat] = bin_df
-        except Exception:
-            continue
+    for i, j in enumerate(kept):
+        feat = feats[j]
+        categories = rank_bins[n_valid[j]].categories
+        n_bins = len(categories)
+        bin_df = pd.DataFrame({
+            f"{feat}_bin": pd.Categorical.from_codes(np.arange(n_bins), categories, ordered=True),
+            "good_rate": good_sum[i, :n_bins] / count[i, :n_bins],
+        })
+        bin_df["lift"] = bin_df["good_rate"] / overall
+        bin_df["count"] = count[i, :n_bins]
+        reports[feat] = bin_df
     return reports
 
 
@@ -57,7 +84,7 @@ def show_lift_analysis(df, target_col=None):
         st.warning("⚠️ Load data first.")
         return
 
-    numeric_cols = df.select_dtypes(include="number").columns.tolist()
+    numeric_cols = numeric_columns(df)
     if not numeric_cols:
         st.warning("⚠️ No numeric columns detected.")
         return
@@ -89,11 +116,13 @@ def show_lift_analysis(df, target_col=None):
         feat_bins = st.selectbox("Feature Bins (qcut)", [2,3,4,5,6,7,8,9,10], index=1)
 
     # --- Build lift reports + cache meta ---
-    settings = (target_col, im_t, targ_m, im_f, feat_m, feat_bins)
+    df_hash = df_fingerprint(df)
+    num_mat, col_idx = numeric_matrix(df)
+    settings = (df_hash, target_col, im_t, targ_m, im_f, feat_m, feat_bins)
     if st.session_state.get("lift_meta") != settings:
         with st.spinner("🔄 Building lift tables…"):
             st.session_state.lift_reports = build_lift_reports(
-                df, target_col, im_t, targ_m, im_f, feat_m, feat_bins
+                df_hash, num_mat, col_idx, target_col, im_t, targ_m, im_f, feat_m, feat_bins
             )
             st.session_state.lift_meta = settings
 
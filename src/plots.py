@@ -1,8 +1,32 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 import plotly.express as px
-import plotly.graph_objects as go
+from src.utils import cached_on_fingerprint, df_fingerprint, numeric_columns
+
+# Larger frames are plotted on a random sample: every point is shipped to the browser as JSON
+PLOT_MAX_POINTS = 20_000
+
+
+@cached_on_fingerprint(max_entries=64)
+def _col_summary(df_hash, df: pd.DataFrame, col: str, numeric: bool):
+    """
+    Value counts of a column as a (value, count) frame, plus its mean, std and skewness when
+    numeric, so reruns of the univariate view skip the full-column passes.
+    """
+    counts = df[col].value_counts().reset_index()
+    counts.columns = [col, "count"]
+    if not numeric:
+        return counts, None
+    return counts, (df[col].mean(), df[col].std(), df[col].skew())
+
+
+@cached_on_fingerprint(max_entries=4)
+def _plot_sample(df_hash, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fixed random sample of PLOT_MAX_POINTS rows to plot, drawn once per loaded frame.
+    """
+    return df.sample(PLOT_MAX_POINTS, random_state=0)
+
 
 def show_plots(df):
     st.subheader("📈 Interactive Data Visualizations")
@@ -12,8 +36,17 @@ def show_plots(df):
         st.warning("⚠️ No data loaded. Please load data first.")
         return
 
-    numeric_cols = df.select_dtypes(include=np.number).columns.tolist()
-    categorical_cols = df.select_dtypes(exclude=np.number).columns.tolist()
+    # One dtype pass (shared with the other tabs); the rest of the columns are categorical
+    numeric_cols = numeric_columns(df)
+    numeric_set = set(numeric_cols)
+    categorical_cols = [c for c in df.columns if c not in numeric_set]
+    # is_numeric_dtype per column from the dtypes alone (unlike select_dtypes it counts bools as numeric)
+    is_num = dict(zip(df.columns, map(pd.api.types.is_numeric_dtype, df.dtypes)))
+
+    # Plots use the sample; counts, summaries and correlations use the full frame
+    sampled = len(df) > PLOT_MAX_POINTS
+    plot_df = _plot_sample(df_fingerprint(df), df) if sampled else df
+    sample_note = f"Showing a random sample of {PLOT_MAX_POINTS:,} of {len(df):,} rows."
 
     plot_type = st.radio("Select Plot Type", ["Univariate", "Bivariate", "Multivariate"], horizontal=True)
 
@@ -23,31 +56,31 @@ def show_plots(df):
         if col:
             st.markdown(f"### 🔍 Univariate Analysis: `{col}`")
 
-            if pd.api.types.is_numeric_dtype(df[col]):
+            counts, stats = _col_summary(df_fingerprint(df), df, col, is_num[col])
+            if is_num[col]:
                 try:
                     # Distribution Plot
-                    fig_dist = px.histogram(df, x=col, nbins=30, marginal="box", title=f"Distribution of {col}")
+                    fig_dist = px.histogram(plot_df, x=col, nbins=30, marginal="box", title=f"Distribution of {col}")
                     fig_dist.update_traces(marker_color="royalblue")
                     st.plotly_chart(fig_dist, use_container_width=True)
+                    if sampled:
+                        st.caption(sample_note)
                 except Exception as e:
                     st.info(f"⚠️ Could not plot distribution: {e}")
 
                 try:
                     # Count of unique values
-                    counts = df[col].value_counts().reset_index()
-                    counts.columns = [col, "count"]
                     fig_count = px.bar(counts, x=col, y="count", title=f"Count of Unique Values in {col}")
                     st.plotly_chart(fig_count, use_container_width=True)
                 except Exception as e:
                     st.info(f"⚠️ Could not plot count: {e}")
 
                 # Summary
-                st.markdown(f"**Summary**: Mean = {df[col].mean():.2f}, Std = {df[col].std():.2f}, Skewness = {df[col].skew():.2f}")
+                mean, std, skew = stats
+                st.markdown(f"**Summary**: Mean = {mean:.2f}, Std = {std:.2f}, Skewness = {skew:.2f}")
 
             else:
                 try:
-                    counts = df[col].value_counts().reset_index()
-                    counts.columns = [col, "count"]
                     fig = px.bar(counts, x=col, y="count", title=f"Frequency of {col}", color="count", color_continuous_scale="Viridis")
                     st.plotly_chart(fig, use_container_width=True)
                     st.markdown(f"**Top Category**: {counts[col].iloc[0]} ({counts['count'].iloc[0]} occurrences)")
@@ -62,17 +95,21 @@ def show_plots(df):
         if col_x and col_y:
             st.markdown(f"### 🔍 Bivariate Analysis: `{col_x}` vs `{col_y}`")
 
-            if pd.api.types.is_numeric_dtype(df[col_x]) and pd.api.types.is_numeric_dtype(df[col_y]):
+            if is_num[col_x] and is_num[col_y]:
                 try:
-                    fig = px.scatter(df, x=col_x, y=col_y, trendline="ols", title=f"Scatter: {col_x} vs {col_y}")
+                    fig = px.scatter(plot_df, x=col_x, y=col_y, trendline="ols", title=f"Scatter: {col_x} vs {col_y}")
                     st.plotly_chart(fig, use_container_width=True)
+                    if sampled:
+                        st.caption(sample_note)
                     st.markdown(f"**Correlation**: {df[col_x].corr(df[col_y]):.2f}")
                 except Exception as e:
                     st.info(f"⚠️ Could not plot scatter: {e}")
             else:
                 try:
-                    fig = px.box(df, x=col_x, y=col_y, points="all", title=f"Boxplot: {col_x} vs {col_y}")
+                    fig = px.box(plot_df, x=col_x, y=col_y, points="all", title=f"Boxplot: {col_x} vs {col_y}")
                     st.plotly_chart(fig, use_container_width=True)
+                    if sampled:
+                        st.caption(sample_note)
                 except Exception as e:
                     st.info(f"⚠️ Could not plot boxplot: {e}")
 
@@ -93,7 +130,7 @@ def show_plots(df):
         if col_x and col_y and color_var:
             try:
                 # Handle numeric vs categorical color mapping
-                if pd.api.types.is_numeric_dtype(df[color_var]):
+                if is_num[color_var]:
                     color_scale = "Viridis"
                 else:
                     color_scale = None  # Let plotly handle categorical colors
@@ -102,7 +139,7 @@ def show_plots(df):
                 hover_dict = {var: True for var in [col_x, col_y, color_var] + extra_hover_vars}
 
                 fig = px.scatter(
-                    df,
+                    plot_df,
                     x=col_x,
                     y=col_y,
                     color=color_var,
@@ -118,11 +155,13 @@ def show_plots(df):
                 )
 
                 st.plotly_chart(fig, use_container_width=True)
+                if sampled:
+                    st.caption(sample_note)
 
                 # Insights
-                if pd.api.types.is_numeric_dtype(df[col_y]):
+                if is_num[col_y]:
                     corr_text = ""
-                    if pd.api.types.is_numeric_dtype(df[color_var]):
+                    if is_num[color_var]:
                         corr_val = df[col_y].corr(df[color_var])
                         corr_text = f" and `{color_var}` (Correlation: {corr_val:.2f})"
                     st.markdown(f"**Highlights**: Observing relation between `{col_x}` and `{col_y}`{corr_text}.")
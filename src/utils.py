@@ -0,0 +1,149 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+
+def df_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Content fingerprint of a DataFrame, used as cache key so Streamlit doesn't have to
+    hash every cell of a wide frame on each rerun. Every row is hashed, so an edited file
+    of the same shape gets a new key, but only once per loaded DataFrame: later reruns
+    reuse the fingerprint of the same object.
+    @param df: pd.DataFrame
+    @return: str combining the shape, column names/dtypes and a hash of all rows
+    """
+    cached = st.session_state.get("df_fingerprint_cache")
+    if cached is None or cached[0] is not df:
+        schema_hash = pd.util.hash_pandas_object(df.dtypes.astype(str), index=True).sum()
+        rows_hash = pd.util.hash_pandas_object(df, index=True).sum() if len(df) else 0
+        cached = (df, f"{df.shape}-{schema_hash}-{rows_hash}")
+        st.session_state["df_fingerprint_cache"] = cached
+    return cached[1]
+
+
+def cached_on_fingerprint(**cache_kwargs):
+    """
+    st.cache_data for functions that take a `df_hash` (see `df_fingerprint`) first and the
+    DataFrame, or a numeric matrix built from it, as another argument. Frames and arrays are
+    left out of the cache key, because hashing them on every rerun costs as much as the work
+    being cached; `df_hash` stands in for their content.
+    @param cache_kwargs: passed on to st.cache_data (max_entries, persist, ...)
+    @return: decorator
+    """
+    return st.cache_data(show_spinner=False, hash_funcs={np.ndarray: lambda _: None, pd.DataFrame: lambda _: None},
+                         **cache_kwargs)
+
+
+def numeric_columns(df: pd.DataFrame) -> list:
+    """
+    Names of the numeric columns of `df`, detected once per loaded DataFrame and
+    reused by every tab on later reruns.
+    @param df: pd.DataFrame
+    @return: list of column names
+    """
+    cached = st.session_state.get("numeric_cols_cache")
+    if cached is None or cached[0] is not df:
+        cached = (df, df.select_dtypes(include="number").columns.tolist())
+        st.session_state["numeric_cols_cache"] = cached
+    return list(cached[1])
+
+
+def numeric_matrix(df: pd.DataFrame) -> tuple:
+    """
+    Numeric columns of `df` as one column-contiguous matrix, built once per loaded DataFrame
+    and shared by the correlation, lift and IV tabs. It is float32 when every numeric column
+    is float32/float16 or an integer of at most 16 bits (what the "Reduce precision" load
+    option produces; float32 holds all of them exactly) and float64 otherwise, so a frame
+    loaded at full precision, or with int32 values that float32 would round, is analysed
+    at full precision. The matrix is read-only:
+    callers copy whatever they need to modify.
+    @param df: pd.DataFrame
+    @return: (matrix of shape (rows, numeric columns), dict column name -> matrix column index)
+    """
+    cached = st.session_state.get("numeric_matrix_cache")
+    if cached is None or cached[0] is not df:
+        cols = numeric_columns(df)
+        exact = all(df[c].dtype in (np.float32, np.float16) or (df[c].dtype.kind in "iub" and df[c].dtype.itemsize <= 2)
+                    for c in cols)
+        dtype = np.float32 if exact else np.float64
+        mat = np.asfortranarray(df[cols].to_numpy(dtype=dtype, na_value=np.nan))
+        mat.flags.writeable = False
+        cached = (df, mat, {c: i for i, c in enumerate(cols)})
+        st.session_state["numeric_matrix_cache"] = cached
+    return cached[1], cached[2]
+
+
+def bin_code_dtype(n_bins: int) -> np.dtype:
+    """
+    Smallest signed integer dtype for per-row bin codes 0..n_bins-1 and the -1 "row not
+    used" marker: int8 up to 127 bins, wider beyond so codes never wrap around.
+    @param n_bins: int. Number of bins
+    @return: np.dtype
+    """
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_bins <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def grouped_bincount(codes: np.ndarray, n_bins: int, weights: np.ndarray) -> tuple:
+    """
+    Row counts and sums of `weights` per (feature, bin) of several binned features, in one
+    bincount pass over all of them instead of a groupby per feature. Shared by the lift and
+    IV tabs.
+    @param codes: np.ndarray (rows, features) with the bin of each row (0..n_bins-1), or -1
+    for rows a feature doesn't use
+    @param n_bins: int. Number of bins per feature
+    @param weights: np.ndarray with one weight per row
+    @return: (counts, sums), both shaped (features, n_bins)
+    """
+    n_feats = codes.shape[1]
+    used = codes >= 0
+    flat = (codes.astype(np.intp) + np.arange(n_feats) * n_bins)[used]
+    row_weights = np.broadcast_to(weights[:, None], codes.shape)[used]
+    counts = np.bincount(flat, minlength=n_feats * n_bins).reshape(n_feats, n_bins)
+    sums = np.bincount(flat, weights=row_weights, minlength=n_feats * n_bins).reshape(n_feats, n_bins)
+    return counts, sums
+
+
+def map_chunks(fn, starts, parallel: bool = True) -> list:
+    """
+    `fn` applied to every chunk start, in order. With more than one chunk the calls run on a
+    small thread pool (few workers, to bound the temporaries of each chunk), which pays off
+    when `fn` spends its time in NumPy calls that release the GIL.
+    @param fn: callable taking a chunk start
+    @param starts: iterable of chunk starts
+    @param parallel: bool. False to always run the chunks one after the other
+    @return: list of the results of `fn`
+    """
+    starts = list(starts)
+    if parallel and len(starts) > 1:
+        with ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1)) as pool:
+            return list(pool.map(fn, starts))
+    return [fn(c0) for c0 in starts]
+
+
+def fill_missing(X: np.ndarray, strategy: str) -> np.ndarray:
+    """
+    Fills the NaNs of every column of X in place with that column's mean, median or most
+    frequent value (smallest value on ties), like sklearn's SimpleImputer without its
+    validation and copies. Shared by the lift and IV tabs.
+    @param X: 2D float np.ndarray whose columns each have at least one non-missing value
+    @param strategy: str. "mean", "median" or "most_frequent"
+    @return: X
+    """
+    if strategy == "mean":
+        fill = np.nanmean(X, axis=0, dtype=np.float64)
+    elif strategy == "median":
+        fill = np.nanmedian(X, axis=0)
+    else:
+        fill = np.empty(X.shape[1])
+        for j in range(X.shape[1]):
+            values, counts = np.unique(X[:, j][~np.isnan(X[:, j])], return_counts=True)
+            fill[j] = values[np.argmax(counts)]
+    rows, cols = np.nonzero(np.isnan(X))
+    X[rows, cols] = fill[cols]
+    return X